@@ -9,3 +9,11 @@ from .source import *
 from .crossmatch import *
 from .ffi import *
 from .update import *
+
+
+def __getattr__(name):
+    # Visualize pulls in matplotlib and lightkurve, so only import it when asked for
+    if name == 'Visualize':
+        from .visualize import Visualize
+        return Visualize
+    raise AttributeError("module 'eleanor' has no attribute '{}'".format(name))
@@ -5,7 +5,6 @@ import socket
 import pandas as pd
 from astroquery.mast import Observations
 from astropy.io import fits
-from lightkurve.search import search_targetpixelfile
 
 from .utils import *
 
@@ -51,6 +50,8 @@ class Crossmatch(object):
              If download == True : Returns a list of lightkurve.lightcurve.TessLightCurve object(s).
              If download == False : Returns a lightkurve.search.SearchResult object.
         """
+        from lightkurve.search import search_targetpixelfile
+
         if sectors is None:
             sectors = self.sector
 
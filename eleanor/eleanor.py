@@ -1,7 +1,6 @@
 import sys, os, ast
 from .source import Source
 from .targetdata import TargetData
-from .visualize import Visualize
 from .update import Update
 
 if __name__ == "__main__":
@@ -1,6 +1,5 @@
 import os, tqdm
 import numpy as np
-import matplotlib.pyplot as plt
 from astropy.io import fits
 from astropy.wcs import WCS, NoConvergence
 from astropy.table import Table
@@ -10,6 +9,7 @@ import requests
 from bs4 import BeautifulSoup
 import warnings
 import urllib
+from functools import lru_cache
 from .utils import EleanorWarning
 from .mast import tic_by_contamination
 
@@ -37,10 +37,21 @@ def check_pointing(sector, camera, chip, path=None):
         pm_downloaded = os.listdir(pm_dir)
         pm = [i for i in pm_downloaded if search in i]
         if len(pm) > 0:
-            return Table.read(os.path.join(pm_dir, pm[0]), format="ascii.basic")
+            path = os.path.abspath(os.path.join(pm_dir, pm[0]))
+            # Callers get their own copy so edits never leak into the cache
+            return _read_pointing_model(path, os.path.getmtime(path)).copy()
     warnings.warn("couldn't find pointing model", category=EleanorWarning)
 
 
+@lru_cache(maxsize=None)
+def _read_pointing_model(path, mtime):
+    """ Parses a pointing model file. Cached on the file's path and
+        modification time, so sources sharing a sector/camera/chip only
+        read it once.
+    """
+    return Table.read(path, format="ascii.basic")
+
+
 def load_pointing_model(pm_dir, sector, camera, chip):
     """ Loads in pointing model.
     """
@@ -69,6 +80,32 @@ def use_pointing_model(coords, pointing_model):
     return fhat
 
 
+def centroids_from_pointing_model(coords, pointing_model):
+    """Applies every cadence of the pointing model to the position of one star.
+
+    Parameters
+    ----------
+    coords : tuple
+        (`x`, `y`) position of the star.
+
+    pointing_model : astropy.table.Table
+        pointing_model for ALL cadences, one row of 9 values per cadence.
+
+    Returns
+    -------
+    centroid_xs, centroid_ys : numpy.ndarray
+        Corrected `x` and `y` position of the star at each cadence.
+    """
+    if hasattr(pointing_model, 'colnames'):
+        matrices = np.column_stack([pointing_model[c] for c in pointing_model.colnames])
+    else:
+        matrices = np.asarray(pointing_model)
+    matrices = np.reshape(matrices.astype(float), (-1, 3, 3))
+    A = np.array([np.squeeze(coords[0]), np.squeeze(coords[1]), 1.0], dtype=float)
+    fhat = np.einsum('j,njk->nk', A, matrices)
+    return fhat[:, 0], fhat[:, 1]
+
+
 def pm_quality(time, sector, camera, chip, pm=None, pm_dir=None):
         """ Fits a line to the centroid motions using the pointing model.
             A quality flag is set if the centroid is > 2*sigma away from
@@ -83,21 +120,16 @@ def pm_quality(time, sector, camera, chip, pm=None, pm_dir=None):
             return mask
 
         cen_x, cen_y = 1024, 1024 # Uses a point in the center of the FFI
-        cent_x,cent_y = [], []
 
         if pm is None:
             pm = load_pointing_model(pm_dir, sector, camera, chip)
 
         # Applies centroids
-        for i in range(len(pm)):
-            new_coords = use_pointing_model(np.array([cen_x, cen_y]), pm[i])
-            cent_x.append(new_coords[0][0])
-            cent_y.append(new_coords[0][1])
-        cent_x = np.array(cent_x); cent_y = np.array(cent_y)
+        cent_x, cent_y = centroids_from_pointing_model([cen_x, cen_y], pm)
 
         # Finds gap in orbits
         t = np.diff(time)
-        brk = np.where( t == np.max(t))[0][0]
+        brk = np.argmax(t)
         brk += 1
 
         # Initiates lists for each orbit
@@ -109,12 +141,18 @@ def pm_quality(time, sector, camera, chip, pm=None, pm_dir=None):
 
 
         # Loops through and searches for points > 2 sigma away from distribution
+        n_masked = 0
         for i in np.arange(0,10,1):
             poly1  = np.polyfit(x1[mask1==0], y1[mask1==0], 1)
             poly2  = np.polyfit(x2[mask2==0], y2[mask2==0], 1)
             mask1  = outliers(x1, y1, poly1, mask1)
             mask2  = outliers(x2, y2, poly2, mask2)
 
+            # Masks only grow, so once no new outliers are found the fits repeat
+            if mask1.sum() + mask2.sum() == n_masked:
+                break
+            n_masked = mask1.sum() + mask2.sum()
+
         # Returns a total mask for each orbit
         return np.append(mask1, mask2)
 
@@ -467,7 +505,6 @@ class ffi:
 
         def apply_pointing_model(xy, matrix):
             pointing_model = matrix
-            centroid_xs, centroid_ys = [], []
             new_coords = use_pointing_model(np.array(xy).T, pointing_model)
             return np.array(new_coords)
 
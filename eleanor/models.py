@@ -1,6 +1,5 @@
 import math
 from astropy.io import fits as pyfits
-from lightkurve.utils import channel_to_module_output
 import numpy as np
 
 # Vaneska models of Ze Vinicius
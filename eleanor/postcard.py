@@ -1,14 +1,12 @@
 import os, sys
 
 from astropy.io import fits
-import matplotlib.pyplot as plt
 from astropy.wcs import WCS
 import numpy as np
 import warnings
 import pandas as pd
 import copy
 from astropy.stats import SigmaClip
-from photutils import MMMBackground
 from .mast import crossmatch_by_position
 from urllib.request import urlopen
 
@@ -55,8 +53,8 @@ class Postcard(object):
     def __init__(self, filename, background, filepath):
         self.filename = os.path.join(filepath, filename)
         self.local_path = copy.copy(self.filename)
-        self.hdu = fits.open(self.local_path)
-        self.background2d = fits.open(os.path.join(filepath, background))[1].data
+        self.hdu = fits.open(self.local_path, memmap=True)
+        self.background2d = fits.open(os.path.join(filepath, background), memmap=True)[1].data
 
     def __repr__(self):
         return "eleanor postcard ({})".format(self.filename)
@@ -83,6 +81,8 @@ class Postcard(object):
         ax : matplotlib.axes.Axes
         """
 
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots(figsize=(8, 7))
         if scale == 'log':
@@ -161,7 +161,10 @@ class Postcard(object):
 
     @property
     def wcs(self):
-        return WCS(self.header)
+        # Parsing the header is slow, so the celestial WCS is built only once
+        if getattr(self, '_wcs', None) is None:
+            self._wcs = WCS(self.header, naxis=2)
+        return self._wcs
 
     @property
     def quality(self):
@@ -246,6 +249,8 @@ class Postcard_tesscut(object):
         ax : matplotlib.axes.Axes
         """
 
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots(figsize=(8, 7))
         if scale == 'log':
@@ -324,7 +329,10 @@ class Postcard_tesscut(object):
 
     @property
     def wcs(self):
-        return WCS(self.header)
+        # Parsing the header is slow, so the celestial WCS is built only once
+        if getattr(self, '_wcs', None) is None:
+            self._wcs = WCS(self.header, naxis=2)
+        return self._wcs
 
     @property
     def quality(self):
@@ -335,6 +343,8 @@ class Postcard_tesscut(object):
 
     @property
     def bkg(self):
+        from photutils import MMMBackground
+
         sigma_clip = SigmaClip(sigma=3.)
         bkg = MMMBackground(sigma_clip=sigma_clip)
         b = bkg.calc_background(self.flux, axis=(1,2))
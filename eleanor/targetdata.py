@@ -1,30 +1,15 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from astropy.nddata import Cutout2D
-from photutils import CircularAperture, RectangularAperture, aperture_photometry
-from photutils import MMMBackground
-from lightkurve import lightcurve
-from lightkurve.correctors import SFFCorrector
-from scipy.optimize import minimize
 from astropy import time, coordinates as coord, units as u
 from astropy.coordinates import SkyCoord, Angle
-from astropy.table import Table, Column
-from astropy.wcs import WCS
+from astropy.table import Table
 from astropy.stats import SigmaClip, sigma_clip
 from time import strftime
 from astropy.io import fits
-from scipy.stats import mode
 from scipy.signal import savgol_filter
-from scipy.interpolate import griddata
-from urllib.request import urlopen
-import os, sys, copy
-import os.path
+import os, copy
 import warnings
-import pickle
 
-from tqdm import tqdm
-
-from .ffi import use_pointing_model, load_pointing_model, centroid_quadratic
+from .ffi import centroids_from_pointing_model, load_pointing_model, centroid_quadratic
 from .postcard import Postcard, Postcard_tesscut
 from .models import Gaussian, Moffat
 from .utils import *
@@ -277,20 +262,14 @@ class TargetData(object):
         self.centroid_xs = None
         self.centroid_ys = None
 
-        xy = WCS(self.post_obj.header, naxis=2).all_world2pix(pos[0], pos[1], 1)
+        xy = self.post_obj.wcs.all_world2pix(pos[0], pos[1], 1)
         # Apply the pointing model to each cadence to find the centroids
 
         if self.pointing_model is None:
             self.centroid_xs = np.zeros_like(self.post_obj.time)
             self.centroid_ys = np.zeros_like(self.post_obj.time)
         else:
-            centroid_xs, centroid_ys = [], []
-            for i in range(len(self.pointing_model)):
-                new_coords = use_pointing_model(np.array(xy), self.pointing_model[i])
-                centroid_xs.append(new_coords[0][0])
-                centroid_ys.append(new_coords[0][1])
-            self.centroid_xs = np.array(centroid_xs)
-            self.centroid_ys = np.array(centroid_ys)
+            self.centroid_xs, self.centroid_ys = centroids_from_pointing_model(xy, self.pointing_model)
 
         # Define tpf as region of postcard around target
         med_x, med_y = np.nanmedian(self.centroid_xs), np.nanmedian(self.centroid_ys)
@@ -303,8 +282,8 @@ class TargetData(object):
             post_bkg2d = self.post_obj.background2d
             post_bkg   = self.post_obj.bkg
         else:
-            post_flux = self.post_obj.flux + 0.0
-            post_err  = self.post_obj.flux_err + 0.0
+            post_flux = self.post_obj.flux
+            post_err  = self.post_obj.flux_err
 
         self.cen_x, self.cen_y = med_x, med_y
 
@@ -368,7 +347,9 @@ class TargetData(object):
                 the edge of the postcard.")
                 warnings.warn("WARNING: Your postage stamp may not be centered.")
 
-            self.tpf     = post_flux[:, y_low_lim:y_upp_lim, x_low_lim:x_upp_lim]
+            # Only the stamp is copied out of the (memory-mapped) postcard,
+            # converted to single precision on the way
+            self.tpf     = post_flux[:, y_low_lim:y_upp_lim, x_low_lim:x_upp_lim].astype(np.float32)
 
             h, w = self.tpf.shape[1], self.tpf.shape[2]
             self.tpf_star_y = w + (med_y - y_upp_lim)
@@ -379,14 +360,16 @@ class TargetData(object):
             if med_y == int((y_upp_lim - y_low_lim)/2 + y_low_lim):
                 self.tpf_star_y = int(height/2)
 
-            self.bkg_tpf = post_bkg2d[:, y_low_lim:y_upp_lim, x_low_lim:x_upp_lim]
+            self.bkg_tpf = post_bkg2d[:, y_low_lim:y_upp_lim, x_low_lim:x_upp_lim].astype(np.float32)
             self.tpf_flux_bkg = self.bkg_subtraction() + post_bkg
-            self.tpf_err = post_err[: , y_low_lim:y_upp_lim, x_low_lim:x_upp_lim]
+            self.tpf_err = post_err[: , y_low_lim:y_upp_lim, x_low_lim:x_upp_lim].astype(np.float32)
             self.tpf_err[np.isnan(self.tpf_err)] = np.inf
 
             # there are NaNs (likely from saturated columns) in the postcard
             # background measure
             if not np.isfinite(self.bkg_tpf).all():
+                from scipy.interpolate import griddata
+
                 # go through every cadence and fill them in
                 tsteps = np.arange(self.bkg_tpf.shape[0])
                 for itime in tsteps:
@@ -420,9 +403,9 @@ class TargetData(object):
             if (height > post_y_length) or (width > post_x_length):
                 raise ValueError("Maximum allowed TPF size should less than the TessCut size.")
 
-            self.tpf = post_flux[:, int(np.floor(post_y_length/2.))-y_length:int(np.floor(post_y_length/2.))+y_length+1, int(np.floor(post_x_length/2.))-x_length:int(np.floor(post_x_length/2.))+x_length+1]
+            self.tpf = post_flux[:, int(np.floor(post_y_length/2.))-y_length:int(np.floor(post_y_length/2.))+y_length+1, int(np.floor(post_x_length/2.))-x_length:int(np.floor(post_x_length/2.))+x_length+1].astype(np.float32)
             self.bkg_tpf = post_flux
-            self.tpf_err = post_err[:, int(np.floor(post_y_length/2.))-y_length:int(np.floor(post_y_length/2.))+y_length+1, int(np.floor(post_x_length/2.))-x_length:int(np.floor(post_x_length/2.))+x_length+1]
+            self.tpf_err = post_err[:, int(np.floor(post_y_length/2.))-y_length:int(np.floor(post_y_length/2.))+y_length+1, int(np.floor(post_x_length/2.))-x_length:int(np.floor(post_x_length/2.))+x_length+1].astype(np.float32)
             self.tpf_err[np.isnan(self.tpf_err)] = np.inf
             self.bkg_subtraction()
 
@@ -466,12 +449,9 @@ class TargetData(object):
 
     def create_apertures(self, height, width):
         """Creates a range of sizes and shapes of apertures to test."""
-        default = 13
+        from photutils import RectangularAperture
 
-        def circle_aperture(pos,r):
-            return CircularAperture(pos,r)
-        def square_aperture(pos, l, w, t):
-            return RectangularAperture(pos, l, w, t)
+        default = 13
 
         if self.source_info.tc == True:
             center = (self.tpf_star_y, self.tpf_star_x)
@@ -501,11 +481,14 @@ class TargetData(object):
         all_apertures  = []
         aperture_names = []
 
+        # Every circle and unrotated square, for both methods, on the same grid at once
+        circles = {method: circle_mask(center, clist, shape, method=method) for method in ['center', 'exact']}
+        squares = {method: rectangle_mask(center, rlist, rlist, shape, method=method) for method in ['center', 'exact']}
+
         for i in range(len(tris)):
-            lap = square_aperture(lines[i][0], lines[i][1], lines[i][2], lines[i][3])
-            tap = square_aperture(tris[i][0] , tris[i][1] , tris[i][2] , tris[i][3])
+            tap = RectangularAperture(tris[i][0] , tris[i][1] , tris[i][2] , tris[i][3])
 
-            lmask, lname = lap.to_mask(method='center').to_image(shape=shape), 'rectangle_{}'.format(int(deg))
+            lmask, lname = rectangle_mask(lines[i][0], lines[i][1], lines[i][2], shape, method='center'), 'rectangle_{}'.format(int(deg))
             tmask, tname = tap.to_mask(method='center').to_image(shape=shape), 'L_{}'.format(int(deg))
 
             if lmask is not None and lmask.sum() > 0:
@@ -516,12 +499,15 @@ class TargetData(object):
                 all_apertures.append(tmask)
                 aperture_names.append(tname)
 
-            cap = circle_aperture(center, clist[i])
-            rap = square_aperture(center, rlist[i], rlist[i], theta[i])
+            rap = RectangularAperture(center, rlist[i], rlist[i], theta[i])
 
             for method in ['center', 'exact']:
-                cmask, cname = cap.to_mask(method=method).to_image(shape=shape), '{}_circle_{}'.format(clist[i], method)
-                rmask, rname = rap.to_mask(method=method).to_image(shape=shape), '{}_square_{}'.format(rlist[i], method)
+                cmask, cname = circles[method][i], '{}_circle_{}'.format(clist[i], method)
+                if theta[i] == 0:
+                    rmask = squares[method][i]
+                else:
+                    rmask = rap.to_mask(method=method).to_image(shape=shape)
+                rname = '{}_square_{}'.format(rlist[i], method)
 
                 if cmask is not None and cmask.sum() > 0:
                     all_apertures.append(cmask)
@@ -534,20 +520,21 @@ class TargetData(object):
             deg += 90
 
 
-        if self.source_info.tc == True:
+        # Stacks the masks into one contiguous (N_apertures, height, width) array
+        all_apertures = np.array(all_apertures, dtype=np.float32)
+
+        if self.source_info.tc == True and len(all_apertures) > 0:
             ## Checks to see if there are empty rows/columns ##
             ## Sets those locations to 0 in the aperture mask ##
             rows = np.unique(np.where(np.nanmedian(self.tpf, axis=0) == 0)[0])
             cols = np.unique(np.where(np.nanmedian(self.tpf, axis=0) == 0)[1])
             if len(rows) > 0 and len(cols) > 0:
                 if np.array_equal(cols, np.arange(0,height,1)):
-                    for i in range(len(all_apertures)):
-                        all_apertures[i][rows,:] = 0
+                    all_apertures[:, rows, :] = 0
                 if np.array_equal(rows, np.arange(0,width,1)):
-                    for i in range(len(all_apertures)):
-                        all_apertures[i][:,cols] = 0
+                    all_apertures[:, :, cols] = 0
 
-        self.all_apertures = np.array(all_apertures)
+        self.all_apertures = all_apertures
         self.aperture_names = np.array(aperture_names)
 
         if height < default or width < default:
@@ -569,6 +556,8 @@ class TargetData(object):
             The standard deviation cut used to determine which pixels are
             representative of the background in each cadence.
         """
+        from photutils import MMMBackground
+
         time = self.time
 
         if self.source_info.tc == True:
@@ -632,26 +621,23 @@ class TargetData(object):
                     "Or, create a custom aperture using the function \
                     TargetData.custom_aperture(). See documentation for inputs.")
 
-            self.all_apertures = np.zeros((1, np.shape(self.tpf[0])[0], np.shape(self.tpf[0])[1]))
+            self.all_apertures = np.zeros((1, np.shape(self.tpf[0])[0], np.shape(self.tpf[0])[1]),
+                                          dtype=np.float32)
             self.all_apertures[0] = self.aperture
 
         self.all_flux_err  = None
 
-        all_raw_lc_pc_sub  = np.zeros((len(self.all_apertures), len(self.tpf)))
-        all_lc_err  = np.zeros((len(self.all_apertures), len(self.tpf)))
-        all_corr_lc_pc_sub = np.copy(all_raw_lc_pc_sub)
+        all_corr_lc_pc_sub = np.zeros((len(self.all_apertures), len(self.tpf)))
 
         # TPF background subtracted light curves
-        all_raw_lc_tpf_sub = np.zeros((len(self.all_apertures), len(self.tpf)))
-        all_corr_lc_tpf_sub = np.copy(all_raw_lc_tpf_sub)
+        all_corr_lc_tpf_sub = np.copy(all_corr_lc_pc_sub)
 
         # 2D background subtracted light curves
-        all_raw_lc_tpf_2d_sub = np.copy(all_raw_lc_tpf_sub)
-        all_corr_lc_tpf_2d_sub = np.copy(all_raw_lc_tpf_sub)
+        all_raw_lc_tpf_2d_sub = np.copy(all_corr_lc_pc_sub)
+        all_corr_lc_tpf_2d_sub = np.copy(all_corr_lc_pc_sub)
 
         if self.source_info.tc == True:
-            for epoch in range(len(self.time)):
-                self.tpf[epoch] -= self.tpf_flux_bkg[epoch]
+            self.tpf -= self.tpf_flux_bkg[:, None, None]
 
         pc_stds  = np.ones(len(self.all_apertures))
         tpf_stds = np.ones(len(self.all_apertures))
@@ -659,25 +645,30 @@ class TargetData(object):
 
         ap_size = np.nansum(self.all_apertures, axis=(1,2))
 
-        bkg_subbed = self.tpf + (self.flux_bkg - self.tpf_flux_bkg)[:, None, None]
+        # Keeps the background subtracted cubes in the TPF's single precision
+        bkg_offset = (self.flux_bkg - self.tpf_flux_bkg).astype(self.tpf.dtype)
+        bkg_subbed = self.tpf + bkg_offset[:, None, None]
         if not self.source_info.tc:
             bkg_subbed_2 = self.tpf - self.bkg_tpf
 
-        for a in range(len(self.all_apertures)):
-            try:
-                all_lc_err[a] = np.sqrt( np.nansum(self.tpf_err**2 * self.all_apertures[a], axis=(1,2)))
-                all_raw_lc_pc_sub[a] = np.nansum( (self.tpf * self.all_apertures[a]), axis=(1,2) )
-                all_raw_lc_tpf_sub[a]  = np.nansum( (bkg_subbed * self.all_apertures[a]), axis=(1,2) )
+        # Sums every cadence over every aperture at once
+        all_lc_err = np.sqrt(aperture_sums(self.tpf_err**2, self.all_apertures))
+        all_raw_lc_pc_sub = aperture_sums(self.tpf, self.all_apertures)
+        all_raw_lc_tpf_sub = aperture_sums(bkg_subbed, self.all_apertures)
 
-                if self.source_info.tc == False:
-                    all_raw_lc_tpf_2d_sub[a] = np.nansum( bkg_subbed_2 * self.all_apertures[a],
-                                                          axis=(1,2))
-            except ValueError:
-                continue
+        if self.source_info.tc == False:
+            all_raw_lc_tpf_2d_sub = aperture_sums(bkg_subbed_2, self.all_apertures)
+            all_bkg_2d = aperture_sums(self.bkg_tpf, self.all_apertures)
 
+        # Loop invariants: aperture row sums and the cadences used for scoring
+        ap_norms = np.nansum(self.all_apertures, axis=2)
+        q = self.quality == 0
+        cal = slice(self.cal_cadences[0], self.cal_cadences[1])
+
+        for a in range(len(self.all_apertures)):
             ## Remove something from all_raw_lc before passing into jitter_corr ##
             try:
-                norm = np.nansum(self.all_apertures[a], axis=1)
+                norm = ap_norms[a]
                 all_corr_lc_pc_sub[a] = self.corrected_flux(flux=all_raw_lc_pc_sub[a]/np.nanmedian(np.abs(all_raw_lc_pc_sub[a])),
                                                            bkg=self.flux_bkg[:, None] * norm)
                 all_corr_lc_tpf_sub[a]= self.corrected_flux(flux=all_raw_lc_tpf_sub[a]/np.nanmedian(np.abs(all_raw_lc_tpf_sub[a])),
@@ -685,19 +676,17 @@ class TargetData(object):
 
                 if self.source_info.tc == False:
                     all_corr_lc_tpf_2d_sub[a] = self.corrected_flux(flux=all_raw_lc_tpf_2d_sub[a]/np.nanmedian(np.abs(all_raw_lc_tpf_2d_sub[a])),
-                                                                    bkg=np.nansum(self.bkg_tpf*self.all_apertures[a], axis=(1,2)))
+                                                                    bkg=all_bkg_2d[a])
 
 
             except IndexError:
                 continue
 
-            q = self.quality == 0
-
-            tpf_stds[a] = get_flattened_sigma(all_corr_lc_tpf_sub[a][q][self.cal_cadences[0]:self.cal_cadences[1]])
-            pc_stds[a] = get_flattened_sigma(all_corr_lc_pc_sub[a][q][self.cal_cadences[0]:self.cal_cadences[1]])
+            tpf_stds[a] = get_flattened_sigma(all_corr_lc_tpf_sub[a][q][cal])
+            pc_stds[a] = get_flattened_sigma(all_corr_lc_pc_sub[a][q][cal])
 
             if self.source_info.tc == False:
-                stds_2d[a] = get_flattened_sigma(all_corr_lc_tpf_2d_sub[a][q][self.cal_cadences[0]:self.cal_cadences[1]])
+                stds_2d[a] = get_flattened_sigma(all_corr_lc_tpf_2d_sub[a][q][cal])
                 all_corr_lc_tpf_2d_sub[a] = all_corr_lc_tpf_2d_sub[a] * np.nanmedian(all_raw_lc_tpf_2d_sub[a])
 
             all_corr_lc_pc_sub[a]  = all_corr_lc_pc_sub[a]  * np.nanmedian(all_raw_lc_pc_sub[a])
@@ -724,12 +713,12 @@ class TargetData(object):
                     stds_2d[ap_size < 15] = 10.0
 
 
-        best_ind_tpf = np.where(tpf_stds == np.nanmin(tpf_stds))[0][0]
-        best_ind_pc  = np.where(pc_stds == np.nanmin(pc_stds))[0][0]
+        best_ind_tpf = int(np.nanargmin(tpf_stds))
+        best_ind_pc  = int(np.nanargmin(pc_stds))
 
         if not self.source_info.tc:
             if np.isfinite(stds_2d).any():
-                best_ind_2d = np.where(stds_2d == np.nanmin(stds_2d))[0][0]
+                best_ind_2d = int(np.nanargmin(stds_2d))
             else:
                 best_ind_2d = None
         else:
@@ -817,12 +806,9 @@ class TargetData(object):
         uses `muchbettermoments` to find the maximum.
         """
 
-        self.x_com = []
-        self.y_com = []
-
         summed_pixels = np.nansum(self.aperture * self.tpf, axis=0)
-        brightest = np.where(summed_pixels == np.max(summed_pixels))
-        cen = [brightest[0][0], brightest[1][0]]
+        brightest = np.unravel_index(np.argmax(summed_pixels), summed_pixels.shape)
+        cen = [brightest[0], brightest[1]]
 
         if cen[0] < 3.0:
             cen[0] = 3
@@ -833,15 +819,14 @@ class TargetData(object):
         if cen[1]+3 > np.shape(self.tpf[0])[1]:
             cen[1] = np.shape(self.tpf[0])[1]-3
 
+        self.x_com = np.empty(len(self.tpf))
+        self.y_com = np.empty(len(self.tpf))
+
         for a in range(len(self.tpf)):
             data = self.tpf[a, cen[0]-2:cen[0]+3, cen[1]-2:cen[1]+3]
             c_0  = centroid_quadratic(data)
-            c_frame = [cen[0]+c_0[0]-2, cen[1]+c_0[1]-2]
-            self.x_com.append(c_frame[0])
-            self.y_com.append(c_frame[1])
-
-        self.x_com = np.array(self.x_com)
-        self.y_com = np.array(self.y_com)
+            self.x_com[a] = cen[0]+c_0[0]-2
+            self.y_com[a] = cen[1]+c_0[1]-2
 
         return
 
@@ -903,6 +888,8 @@ class TargetData(object):
             reasonable job estimating the background more accurately in relatively crowded regions.
         """
         import tensorflow as tf
+        from scipy.stats import mode
+        from tqdm import tqdm
 
         tf.logging.set_verbosity(tf.logging.ERROR)
 
@@ -1021,8 +1008,6 @@ class TargetData(object):
         else:
             raise ValueError("likelihood argument {0} not supported".format(likelihood))
 
-        grad = tf.gradients(nll, var_list)
-
         sess = tf.Session(config=tf.ConfigProto(device_count={'GPU': 0}))
         sess.run(tf.global_variables_initializer())
 
@@ -1109,6 +1094,8 @@ class TargetData(object):
             The method of producing a light curve to be used, either `exact`, `center`, or `subpixel`.
             Passed through to photutils and used as intended by that package.
         """
+        from photutils import CircularAperture, RectangularAperture
+
         if shape is None:
             raise Exception("Please select a shape: circle or rectangle")
 
@@ -1140,7 +1127,7 @@ class TargetData(object):
 
     def find_break(self):
         t   = np.diff(self.time)
-        ind = np.where( t == np.max(t))[0][0]
+        ind = np.argmax(t)
         return ind + 1
 
 
@@ -1161,18 +1148,9 @@ class TargetData(object):
         t1 = self.time[r1]; f1 = flux[r1]
         t2 = self.time[r2]; f2 = flux[r2]
 
-        sff = SFFCorrector()
-        corr_lc_obj_1 = sff.correct(time=t1, flux=f1,
-                                    centroid_col=self.centroid_xs[r1],
-                                    centroid_row=self.centroid_ys[r1],
-                                    windows=1, polyorder=2, niters=3, sigma_1=3, sigma_2=5,
-                                    restore_trend=True, bins=15)
-        corr_lc_obj_2 = sff.correct(time=t2, flux=f2,
-                                    centroid_col=self.centroid_xs[r2],
-                                    centroid_row=self.centroid_ys[r2],
-                                    windows=1, polyorder=2, niters=3, sigma_1=3, sigma_2=5,
-                                    restore_trend=True, bins=15)
-        return np.append(corr_lc_obj_1.flux, corr_lc_obj_2.flux)
+        corr_1 = sff_correction(t1, f1, self.centroid_xs[r1], self.centroid_ys[r1])
+        corr_2 = sff_correction(t2, f2, self.centroid_xs[r2], self.centroid_ys[r2])
+        return np.append(corr_1, corr_2)
 
 
     def corrected_flux(self, flux=None, skip=0.25, modes=3, pca=False, bkg=None, regressors=None):
@@ -1232,18 +1210,21 @@ class TargetData(object):
         def calc_corr(mask, cx, cy, skip):
             nonlocal quality, flux, bkg, regressors
 
-            badx = np.where(np.abs(cx - np.nanmedian(cx)) > 3*np.std(cx))[0]
-            bady = np.where(np.abs(cy - np.nanmedian(cy)) > 3*np.std(cy))[0]
+            badx = np.abs(cx - np.nanmedian(cx)) > 3*np.std(cx)
+            bady = np.abs(cy - np.nanmedian(cy)) > 3*np.std(cy)
 
             # temp_lc = lightcurve.LightCurve(t, flux).flatten()
-            tmp_flux = np.copy(flux[np.isfinite(flux)], order="C")
+            finite = np.isfinite(flux)
+            tmp_flux = np.copy(flux[finite], order="C")
             tmp_flux[:] /= savgol_filter(tmp_flux, 101, 2)
             SC = sigma_clip(tmp_flux, sigma_upper=3.5, sigma_lower=3.5)
 
-            quality[badx] = -999
-            quality[bady] = -999
+            # The clip only saw finite cadences; map it back onto all of them.
+            # Non-finite cadences are left out of the fit entirely.
+            clipped = np.zeros(len(flux), dtype=bool)
+            clipped[finite] = np.ma.getmaskarray(SC)
 
-            quality[SC.mask == True] = -999
+            quality[badx | bady | clipped | ~finite] = -999
 
             qm = quality[mask] == 0
 
@@ -1263,29 +1244,26 @@ class TargetData(object):
             vv = self.cbvs[mask][:,0:modes]
 
             if pca == False:
-                cm = np.column_stack((t[mask][qm][skip:], np.ones_like(t[mask][qm][skip:])))
-                cm_full = np.column_stack((t[mask], np.ones_like(t[mask])))
+                columns = [t[mask], np.ones_like(t[mask])]
 
                 if np.std(vv) > 1e-10:
-                    cm = np.column_stack((cm, vv[qm][skip:]))
-                    cm_full = np.column_stack((cm_full, vv))
-
+                    columns.append(vv)
 
                 if np.std(bkg) > 1e-10:
-                    cm = np.column_stack((cm, bkg_use[qm][skip:]))
-                    cm_full = np.column_stack((cm_full, bkg_use))
+                    columns.append(bkg_use)
 
                 if np.std(cx) > 1e-10:
-                    cm = np.column_stack((cm, cx[qm][skip:], cy[qm][skip:], cx[qm][skip:]**2, cy[qm][skip:]**2))
-                    cm_full = np.column_stack((cm_full, cx, cy, cx**2, cy**2))
+                    columns.extend([cx, cy, cx**2, cy**2])
 
                 if regressors is not None:
-                    cm = np.column_stack((cm, regressors[mask][qm][skip:]))
-                    cm_full = np.column_stack((cm_full, regressors[mask]))
+                    columns.append(regressors[mask])
 
             else:
-                cm = np.column_stack((vv[qm][skip:], np.ones_like(t[mask][qm][skip:])))
-                cm_full = np.column_stack((vv, np.ones_like(t[mask])))
+                columns = [vv, np.ones_like(t[mask])]
+
+            # The fit only uses good quality cadences after the first `skip`
+            cm_full = np.column_stack(columns)
+            cm = cm_full[qm][skip:]
 
 
             x = xhat(cm, norm_l[skip:])
@@ -1742,6 +1720,50 @@ def rotate_centroids(centroid_col, centroid_row):
     _, eig_vecs = np.linalg.eigh(np.cov(centroids))
     return np.dot(eig_vecs, centroids)
 
+def sff_correction(time, flux, centroid_col, centroid_row, polyorder=2, flux_order=5,
+                   niters=3, sigma=5):
+    """Self flat-fielding (Vanderburg & Johnson 2014) for a single window.
+
+    Projects the centroids onto their principal axis, measures the arclength
+    along a `polyorder` polynomial fit to the centroid track, and divides out
+    a least-squares `flux_order` polynomial in arclength fit to the detrended
+    flux. The long-term trend of `flux` is preserved.
+    """
+    flux = np.asarray(flux, dtype=float)
+    good = np.isfinite(flux) & np.isfinite(centroid_col) & np.isfinite(centroid_row)
+
+    # Long-term trend, removed only while fitting the motion systematics
+    trend = np.polyval(np.polyfit(time[good], flux[good], 3), time)
+    detrended = flux / trend
+
+    centroids = np.array([centroid_col - np.nanmedian(centroid_col),
+                          centroid_row - np.nanmedian(centroid_row)])
+
+    # Without centroid motion (e.g. no pointing model) there is nothing to decorrelate
+    if np.std(centroids[:, good]) < 1e-10:
+        return np.copy(flux)
+
+    _, eig_vecs = np.linalg.eigh(np.cov(centroids[:, good]))
+    minor, major = np.dot(eig_vecs.T, centroids)
+
+    # Arclength along the centroid track
+    track = np.polyder(np.polyfit(major[good], minor[good], polyorder))
+    grid = np.linspace(np.nanmin(major), np.nanmax(major), 1000)
+    dl = np.sqrt(1 + np.polyval(track, grid)**2)
+    length = np.append(0, np.cumsum(0.5 * (dl[1:] + dl[:-1]) * np.diff(grid)))
+    s = np.interp(major, grid, length)
+
+    vander = np.vander(s, flux_order + 1)
+    fit = np.copy(good)
+    model = np.ones_like(flux)
+    for _ in range(niters):
+        coef = np.linalg.lstsq(vander[fit], detrended[fit], rcond=None)[0]
+        model = np.dot(vander, coef)
+        resid = detrended - model
+        fit = good & (np.abs(resid) < sigma * np.nanstd(resid[fit]))
+
+    return flux / model * np.nanmedian(model[good])
+
 def get_flattened_sigma(y, maxiter=100, window_size=51, nsigma=4):
     y = np.copy(y[np.isfinite(y)], order="C")
     y[:] /= savgol_filter(y, window_size, 2)
@@ -1756,3 +1778,88 @@ def get_flattened_sigma(y, maxiter=100, window_size=51, nsigma=4):
             break
         n = m.sum()
     return sig
+
+def aperture_sums(cube, apertures):
+    """Weighted sum of each (`height`, `width`) frame of `cube` over each
+    aperture. Returns an array of shape (len(apertures), len(cube)).
+
+    Matches `np.nansum(cube * aperture, axis=(1,2))`: NaN pixels are ignored,
+    infinite pixels inside an aperture make its sum infinite with the same
+    sign, and infinities of both signs give NaN. Non-finite aperture weights
+    are likewise ignored, as if they were zero. Sums are accumulated in
+    double precision even for single precision inputs.
+    """
+    # Flattening the pixels turns the contraction into a single BLAS matrix
+    # product, which is multithreaded over cadences and apertures
+    flat = np.reshape(cube, (len(cube), -1))
+    weights = np.reshape(apertures, (len(apertures), -1))
+    weights = np.where(np.isfinite(weights), weights, 0)
+
+    # Pixels outside every aperture contribute nothing, so skip them entirely
+    support = np.flatnonzero(np.any(weights != 0, axis=0))
+    flat = flat[:, support]
+    weights = weights[:, support]
+
+    finite = np.isfinite(flat)
+    sums = np.dot(weights.astype(np.float64),
+                  np.where(finite, flat, 0.0).astype(np.float64).T)
+    if not finite.all():
+        posinf, neginf = np.isposinf(flat).T, np.isneginf(flat).T
+        up = np.dot(weights > 0, posinf) | np.dot(weights < 0, neginf)
+        down = np.dot(weights > 0, neginf) | np.dot(weights < 0, posinf)
+        sums[up & ~down] = np.inf
+        sums[down & ~up] = -np.inf
+        sums[up & down] = np.nan
+    return sums
+
+def circle_mask(center, r, shape, method='exact'):
+    """Rasterizes a circular aperture onto a (`height`, `width`) grid.
+
+    Uses the same pixel convention as photutils: pixel (i, j) is centered
+    on (x=j, y=i). With `method='exact'` each pixel is weighted by the
+    fraction of it covered by the circle, computed analytically. With
+    `method='center'` a pixel is included if its center lies inside.
+
+    `r` may be an array of radii, in which case a stack of masks of shape
+    (len(r), `height`, `width`) is returned in a single pass.
+    """
+    r = np.asarray(r, dtype=float)[..., None, None]
+    ys, xs = np.indices(shape, dtype=float)
+    xs -= center[0]
+    ys -= center[1]
+
+    if method == 'center':
+        return (xs**2 + ys**2 < r**2).astype(float)
+
+    def segment(t):
+        # Area under the quarter circle between 0 and t
+        return 0.5 * (t * np.sqrt(r**2 - t**2) + r**2 * np.arcsin(t / r))
+
+    def quadrant(x, y):
+        # Signed area of the circle inside the rectangle spanned by (0,0) and (x,y)
+        a = np.minimum(np.abs(x), r)
+        b = np.minimum(np.abs(y), r)
+        xb = np.minimum(a, np.sqrt(r**2 - b**2))
+        return np.sign(x) * np.sign(y) * (xb * b + segment(a) - segment(xb))
+
+    x0, x1 = xs - 0.5, xs + 0.5
+    y0, y1 = ys - 0.5, ys + 0.5
+    return quadrant(x1, y1) - quadrant(x0, y1) - quadrant(x1, y0) + quadrant(x0, y0)
+
+def rectangle_mask(center, w, h, shape, method='exact'):
+    """Rasterizes an unrotated `w` by `h` rectangular aperture onto a
+    (`height`, `width`) grid, following the conventions of `circle_mask`.
+    `w` and `h` may be arrays of equal length to build a stack of masks.
+    """
+    w = np.asarray(w, dtype=float)[..., None, None]
+    h = np.asarray(h, dtype=float)[..., None, None]
+    ys, xs = np.indices(shape, dtype=float)
+    xs -= center[0]
+    ys -= center[1]
+
+    if method == 'center':
+        return ((np.abs(xs) < w/2.) & (np.abs(ys) < h/2.)).astype(float)
+
+    x_overlap = np.clip(xs + 0.5, -w/2., w/2.) - np.clip(xs - 0.5, -w/2., w/2.)
+    y_overlap = np.clip(ys + 0.5, -h/2., h/2.) - np.clip(ys - 0.5, -h/2., h/2.)
+    return x_overlap * y_overlap
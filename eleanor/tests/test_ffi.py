@@ -1,5 +1,7 @@
 import os.path
-from ..ffi import ffi
+import numpy as np
+from astropy.table import Table
+from ..ffi import ffi, use_pointing_model, centroids_from_pointing_model
 
 def test_ffi_dir():
     """Are FFIs downloaded to the correct location?"""
@@ -15,3 +17,31 @@ def test_ffi_dir():
     # make sure the ffi_dir exists and matches the default dir
     assert(os.path.isdir(ffi_dir))
     assert(ffi_dir == default_dir)
+
+def test_centroids_from_pointing_model():
+    """Does applying the whole pointing model at once match applying it
+    one cadence at a time?"""
+    rng = np.random.default_rng(3)
+    matrices = np.tile(np.eye(3).flatten(), (25, 1))
+    matrices[:, [0, 1, 3, 4]] += 1e-4 * rng.normal(size=(25, 4))
+    matrices[:, [6, 7]] += 0.1 * rng.normal(size=(25, 2))
+    pm = Table(matrices, names=[str(i) for i in range(9)])
+
+    xy = [np.array(512.3), np.array(100.7)]
+    expected = np.array([use_pointing_model(np.array(xy), row)[0] for row in pm])
+    cen_x, cen_y = centroids_from_pointing_model(xy, pm)
+
+    assert(np.allclose(cen_x, expected[:, 0], rtol=0, atol=1e-10))
+    assert(np.allclose(cen_y, expected[:, 1], rtol=0, atol=1e-10))
+
+def test_check_pointing_returns_copies(tmp_path):
+    """Are cached pointing models handed out as independent copies?"""
+    from ..ffi import check_pointing
+
+    fn = tmp_path / 's0001-1-1_tess_v2_pm.txt'
+    fn.write_text('0 1 2 3 4 5 6 7 8\n' + '1 0 0 0 1 0 0 0 1\n' * 3)
+
+    pm = check_pointing(1, 1, 1, path=str(tmp_path))
+    pm['6'][:] = 99.0
+
+    assert(np.all(check_pointing(1, 1, 1, path=str(tmp_path))['6'] == 0))
@@ -28,3 +28,138 @@ def test_arb_size_tpfs():
     star = Source(tic=29987116, sector=1, tc=True)
     data = TargetData(star, height=15, width=13)
     assert(np.shape(data.raw_flux[0] == (15,13))) # eleanor enforces oddness
+
+def test_sff_correction():
+    """Does self flat-fielding remove motion systematics, and leave the
+    light curve alone when the centroids never move?"""
+    from ..targetdata import sff_correction
+
+    rng = np.random.default_rng(42)
+    t = np.linspace(0, 13, 600)
+    motion = 0.5 * np.sin(5 * t)
+    cx = 100 + motion + 0.01 * rng.normal(size=len(t))
+    cy = 50 + 0.5 * motion**2 + 0.01 * rng.normal(size=len(t))
+    trend = 1000 * (1 + 0.01 * t / 13)
+    flux = trend * (1 + 0.02 * motion + 0.01 * motion**2) + 0.5 * rng.normal(size=len(t))
+
+    corr = sff_correction(t, flux, cx, cy)
+    assert(np.std(corr / trend) < 0.2 * np.std(flux / trend))
+
+    still = np.zeros_like(t)
+    assert(np.array_equal(sff_correction(t, flux, still, still), flux))
+    assert(np.array_equal(sff_correction(t, flux, cx, cy, niters=0), flux))
+
+def test_corrected_flux_nan_cadence():
+    """Does a single NaN cadence stay confined to that cadence in the
+    corrected light curve?"""
+    rng = np.random.default_rng(0)
+    n = 1000
+    time = np.append(np.linspace(0, 13, n//2), np.linspace(14, 27, n//2))
+
+    data = TargetData.__new__(TargetData)
+    data.time = time
+    data.quality = np.zeros(n, dtype=int)
+    data.centroid_xs = 0.05 * rng.normal(size=n)
+    data.centroid_ys = 0.05 * rng.normal(size=n)
+    data.cbvs = np.zeros((n, 16))
+    data.flux_bkg = 10 + rng.normal(size=n)
+    data.regressors = None
+
+    flux = 1000 + rng.normal(size=n)
+    flux[123] = np.nan
+    corr = data.corrected_flux(flux=flux)
+
+    assert(np.isnan(corr[123]))
+    assert(np.isfinite(np.delete(corr, 123)).all())
+
+def test_aperture_masks_match_photutils():
+    """Do the analytic aperture masks reproduce photutils' weights?"""
+    from photutils.aperture import CircularAperture, RectangularAperture
+    from ..targetdata import circle_mask, rectangle_mask
+
+    shape = (13, 15)
+    for center in [(6, 6), (7.3, 5.8), (6, 6.5), (0.4, 12.2)]:
+        for r in [1.25, 2.5, 3.5, 4]:
+            for method in ['center', 'exact']:
+                expected = CircularAperture(center, r).to_mask(method=method).to_image(shape)
+                assert(np.allclose(circle_mask(center, r, shape, method=method), expected,
+                                   rtol=0, atol=1e-10))
+
+        for w, h in [(1, 2), (2, 1), (3, 3), (4.1, 4.1)]:
+            # photutils approximates exact rectangles by subsampling each pixel
+            for method, atol in [('center', 0), ('exact', 0.025)]:
+                expected = RectangularAperture(center, w, h, theta=0).to_mask(method=method).to_image(shape)
+                assert(np.allclose(rectangle_mask(center, w, h, shape, method=method), expected,
+                                   rtol=0, atol=atol))
+
+    # a stack of radii matches the masks made one radius at a time
+    radii = [1.25, 2.5, 3.5, 4]
+    stack = circle_mask((7.3, 5.8), radii, shape)
+    for i, r in enumerate(radii):
+        assert(np.allclose(stack[i], circle_mask((7.3, 5.8), r, shape)))
+
+def test_aperture_sums():
+    """Does the vectorized photometry match np.nansum aperture by aperture,
+    including NaN and infinite pixels?"""
+    from ..targetdata import aperture_sums
+
+    rng = np.random.default_rng(1)
+    cube = rng.normal(size=(40, 13, 13)).astype(np.float32)
+    cube[3, 6, 6] = np.nan
+    cube[5, 6, 7] = np.inf
+    cube[8, 7, 6] = -np.inf
+    cube[11, 6, 6], cube[11, 7, 7] = np.inf, -np.inf
+    cube[:, 0, 0] = np.inf # outside every aperture
+
+    apertures = np.zeros((6, 13, 13), dtype=np.float32)
+    apertures[:, 4:9, 4:9] = rng.random((6, 5, 5))
+    apertures[0, 6, 7] = 0.0
+    apertures[1, 5, 5] = np.nan
+    apertures[2, 4, 8] = np.inf
+
+    with np.errstate(invalid='ignore'):
+        expected = np.array([np.nansum(np.where(np.isfinite(ap), ap, 0) * cube, axis=(1,2))
+                             for ap in apertures])
+    assert(np.allclose(aperture_sums(cube, apertures), expected, equal_nan=True))
+
+    # A NaN weight drops its pixel instead of poisoning the whole sum
+    mask = np.ones((1, 5, 5))
+    mask[0, 2, 2] = np.nan
+    assert(np.allclose(aperture_sums(np.ones((3, 5, 5)), mask), 24))
+
+def test_lightcurve_background_regressor():
+    """Is each aperture's background regressor built from its per-row
+    weight sums, also for non-square TPFs and asymmetric apertures?"""
+    from types import SimpleNamespace
+
+    rng = np.random.default_rng(5)
+    n, height, width = 120, 9, 13
+
+    data = TargetData.__new__(TargetData)
+    data.source_info = SimpleNamespace(tc=True, tess_mag=10.0)
+    data.language = 'English'
+    data.aperture = None
+    data.aperture_mode = 3
+    data.cal_cadences = (0, n)
+    data.quality = np.zeros(n, dtype=int)
+    data.tpf = rng.normal(100, 1, size=(n, height, width)).astype(np.float32)
+    data.tpf_err = np.ones((n, height, width), dtype=np.float32)
+    data.flux_bkg = rng.normal(10, 1, size=n)
+    data.tpf_flux_bkg = rng.normal(10, 1, size=n)
+    data.all_apertures = np.zeros((3, height, width), dtype=np.float32)
+    data.all_apertures[0, 2:5, 3:9] = 1
+    data.all_apertures[1, 4, 6] = 1
+    data.all_apertures[2, 1:8, 5:7] = rng.random((7, 2))
+
+    regressors = []
+    def corrected_flux(flux=None, bkg=None, **kwargs):
+        regressors.append(bkg)
+        return np.ones(n) + 1e-3 * rng.normal(size=n)
+    data.corrected_flux = corrected_flux
+
+    data.get_lightcurve()
+
+    for a, ap in enumerate(data.all_apertures):
+        row_sums = np.nansum(ap, axis=1)
+        assert(np.allclose(regressors[2*a], data.flux_bkg[:, None] * row_sums))
+        assert(np.allclose(regressors[2*a+1], data.tpf_flux_bkg[:, None] * row_sums))